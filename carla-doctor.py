@@ -5,15 +5,28 @@ Checks if a CARLA UE4 driving simulator client station is fully configured.
 Similar to 'flutter doctor' - provides comprehensive system validation.
 """
 
-import os
 import sys
+import platform
+
+# Bail out before loading anything Windows-only (winreg, ctypes.wintypes)
+if platform.system() != "Windows":
+    print("Error: This script must be run on Windows.")
+    sys.exit(1)
+
+import os
+import shutil
+import stat
 import subprocess
+import ctypes
 import winreg
-import platform
+import asyncio
+import time
 import json
-import re
-import urllib.request
-import urllib.error
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from ctypes import wintypes
 from pathlib import Path
 from typing import Tuple, List, Optional, Dict, Any
 
@@ -27,243 +40,532 @@ class Colors:
     BOLD = '\033[1m'
     RESET = '\033[0m'
 
-def print_header():
-    """Print the doctor header."""
-    print(f"\n{Colors.CYAN}{'=' * 70}{Colors.RESET}")
-    print(f"{Colors.BOLD}{Colors.CYAN}CARLA Client Station Doctor{Colors.RESET}")
-    print(f"{Colors.CYAN}{'=' * 70}{Colors.RESET}\n")
+# One snapshot of the environment, shared by every check in this run
+ENV = dict(os.environ)
+
+STARTUP_DIR = os.path.join(ENV.get("APPDATA", ""), r"Microsoft\Windows\Start Menu\Programs\Startup")
+
+# Python 3.7 on Windows defaults to a selector loop, which cannot run subprocesses
+if sys.platform == "win32" and sys.version_info < (3, 8):
+    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+# Redirected to a file or CI log: leave the escape codes out entirely
+if not sys.stdout.isatty():
+    Colors = type("Colors", (), {name: "" for name in ("GREEN", "RED", "YELLOW", "BLUE", "CYAN", "BOLD", "RESET")})
 
-def print_section(title: str):
-    """Print a section header."""
-    print(f"\n{Colors.BOLD}{Colors.BLUE}[{title}]{Colors.RESET}")
+# Pre-built ANSI-wrapped fragments for the report
+OK_ICON = f"{Colors.GREEN}✓{Colors.RESET}"
+FAIL_ICON = f"{Colors.RED}✗{Colors.RESET}"
+OPT_ICON = f"{Colors.YELLOW}!{Colors.RESET}"
+OK_TXT = f"{Colors.GREEN}OK{Colors.RESET}"
+FAIL_TXT = f"{Colors.RED}MISSING{Colors.RESET}"
+OPT_TXT = f"{Colors.YELLOW}OPTIONAL{Colors.RESET}"
+SECTION_FMT = f"\n{Colors.BOLD}{Colors.BLUE}[{{}}]{Colors.RESET}\n"
+SEPARATOR = f"{Colors.CYAN}{'=' * 70}{Colors.RESET}"
+HEADER = f"\n{SEPARATOR}\n{Colors.BOLD}{Colors.CYAN}CARLA Client Station Doctor{Colors.RESET}\n{SEPARATOR}\n\n"
+SUMMARY_HEADER = f"\n{SEPARATOR}\n{Colors.BOLD}Summary{Colors.RESET}\n{SEPARATOR}\n\n"
+# Check line prefixes by outcome, formatted with the check name
+CHECK_OK_FMT = f"  {OK_ICON} {{}}: {OK_TXT}"
+CHECK_FAIL_FMT = f"  {FAIL_ICON} {{}}: {FAIL_TXT}"
+CHECK_OPT_FMT = f"  {OPT_ICON} {{}}: {OPT_TXT}"
 
-def print_check(name: str, status: bool, message: str = "", optional: bool = False):
-    """Print a check result."""
+def format_header() -> str:
+    """Format the doctor header."""
+    return HEADER
+
+def format_section(title: str) -> str:
+    """Format a section header."""
+    return SECTION_FMT.format(title)
+
+def format_check(name: str, status: bool, message: str = "", optional: bool = False) -> str:
+    """Format a check result line."""
     if status:
-        icon = f"{Colors.GREEN}✓{Colors.RESET}"
-        status_text = f"{Colors.GREEN}OK{Colors.RESET}"
+        prefix = CHECK_OK_FMT.format(name)
+    elif optional:
+        prefix = CHECK_OPT_FMT.format(name)
     else:
-        icon = f"{Colors.RED}✗{Colors.RESET}"
-        status_text = f"{Colors.RED}MISSING{Colors.RESET}"
-        if optional:
-            icon = f"{Colors.YELLOW}!{Colors.RESET}"
-            status_text = f"{Colors.YELLOW}OPTIONAL{Colors.RESET}"
+        prefix = CHECK_FAIL_FMT.format(name)
     
-    print(f"  {icon} {name}: {status_text}", end="")
     if message:
-        print(f" - {message}")
-    else:
-        print()
+        return f"{prefix} - {message}\n"
+    return prefix + "\n"
+
+# Seconds to wait for a probe command; '--version' normally answers in well under 100 ms
+PROBE_TIMEOUT = 1
+# The py launcher gets longer: its first start is often held up by a Defender scan,
+# and unlike VS Code there is no install-folder fallback to catch a timeout
+PY_PROBE_TIMEOUT = 3
 
-def check_windows():
-    """Verify running on Windows."""
-    return platform.system() == "Windows"
+# After killing a timed-out probe, how long to wait for it to be reaped. proc.wait()
+# only returns once every pipe has closed, and a grandchild (Code.exe behind
+# code.cmd) can hold stdout open indefinitely
+PROBE_KILL_GRACE = 0.2
+
+# Spawn options shared by every probe: no console window, no inherited stdin,
+# stderr discarded, only stdout captured (as bytes, decoded once)
+_SUBPROC_KW = dict(
+    stdin=asyncio.subprocess.DEVNULL,
+    stdout=asyncio.subprocess.PIPE,
+    stderr=asyncio.subprocess.DEVNULL,
+    creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+)
+
+async def _run_probe(cmd: List[str], timeout: float = PROBE_TIMEOUT) -> Tuple[Optional[int], str]:
+    """Run a short probe command without a console window.
+    
+    Returns (returncode, stdout), or (None, "") if the command is not on PATH,
+    could not be started, or was killed after timeout seconds.
+    """
+    # Resolve through PATH/PATHEXT in-process; nothing to spawn if it is missing
+    executable = shutil.which(cmd[0])
+    if executable is None:
+        return None, ""
+    try:
+        proc = await asyncio.create_subprocess_exec(executable, *cmd[1:], **_SUBPROC_KW)
+    except OSError:
+        return None, ""
+    try:
+        out, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        try:
+            await asyncio.wait_for(proc.wait(), PROBE_KILL_GRACE)
+        except asyncio.TimeoutError:
+            # asyncio.subprocess.Process has no public close(); dropping our end of the
+            # pipes lets the loop finish the probe without waiting on the grandchild
+            proc._transport.close()
+        return None, ""
+    return proc.returncode, out.decode(errors="replace")
+
+# Results of batch_probe(), keyed by the command line each probe runs
+_PROBE_CACHE: Dict[str, Any] = {}
+
+def _cached_probe(key: str, probe, *args):
+    """Return a cached batch_probe() result, running the probe on a cache miss."""
+    if key not in _PROBE_CACHE:
+        _PROBE_CACHE[key] = probe(*args)
+    return _PROBE_CACHE[key]
 
 def check_command_exists(command: str) -> bool:
     """Check if a command exists in PATH."""
-    try:
-        result = subprocess.run(
-            [command, "--version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        return result.returncode == 0
-    except (subprocess.SubprocessError, FileNotFoundError, OSError):
-        return False
+    return shutil.which(command) is not None
+
+async def _probe_code_version() -> Tuple[Optional[int], str]:
+    """Run 'code --version'; batched with the other spawned probes."""
+    return await _run_probe(["code", "--version"])
+
+UNINSTALL_KEY = r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"
+
+# Fixed uninstall subkeys written by the VS Code setup (Inno Setup AppId + "_is1")
+VSCODE_UNINSTALL_KEYS = [
+    (winreg.HKEY_CURRENT_USER, "{771FD6B0-FA20-440A-A002-3B3BAC16DC50}_is1", winreg.KEY_WOW64_64KEY),  # user, x64
+    (winreg.HKEY_LOCAL_MACHINE, "{EA457B21-F73E-494C-ACAB-524FDE069978}_is1", winreg.KEY_WOW64_64KEY),  # system, x64
+    (winreg.HKEY_CURRENT_USER, "{D628A17A-9713-46BF-8D57-E671B46A741E}_is1", winreg.KEY_WOW64_64KEY),  # user, x86
+    (winreg.HKEY_LOCAL_MACHINE, "{F8A2A208-72B3-4D61-95FC-8A65D340689B}_is1", winreg.KEY_WOW64_32KEY),  # system, x86
+]
+
+def _find_vscode_uninstall_key() -> Optional[str]:
+    """Open the known VS Code uninstall subkeys directly; DisplayName of the first found."""
+    for root, guid, view in VSCODE_UNINSTALL_KEYS:
+        try:
+            with winreg.OpenKey(root, UNINSTALL_KEY + "\\" + guid, 0, winreg.KEY_READ | view) as key:
+                return winreg.QueryValueEx(key, "DisplayName")[0]
+        except OSError:
+            continue
+    return None
 
 def check_vscode_installed() -> Tuple[bool, str]:
     """Check if VS Code is installed on Windows."""
     # Method 1: Check if 'code' command is in PATH
-    try:
-        result = subprocess.run(
-            ["code", "--version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            version = result.stdout.split('\n')[0].strip()
-            return True, f"Found in PATH (v{version})"
-    except (subprocess.SubprocessError, FileNotFoundError, OSError):
-        pass
+    returncode, out = _cached_probe("code --version", lambda: asyncio.run(_probe_code_version()))
+    if returncode == 0:
+        version = out.split('\n')[0].strip()
+        return True, f"Found in PATH (v{version})"
     
     # Method 2: Check common installation paths
     common_paths = [
-        Path(os.environ.get("LOCALAPPDATA", "")) / "Programs" / "Microsoft VS Code" / "Code.exe",
-        Path(os.environ.get("PROGRAMFILES", "")) / "Microsoft VS Code" / "Code.exe",
-        Path(os.environ.get("PROGRAMFILES(X86)", "")) / "Microsoft VS Code" / "Code.exe",
+        Path(ENV.get("LOCALAPPDATA", "")) / "Programs" / "Microsoft VS Code" / "Code.exe",
+        Path(ENV.get("PROGRAMFILES", "")) / "Microsoft VS Code" / "Code.exe",
+        Path(ENV.get("PROGRAMFILES(X86)", "")) / "Microsoft VS Code" / "Code.exe",
     ]
     
     for vscode_path in common_paths:
         if vscode_path.exists():
             return True, f"Found at {vscode_path}"
     
-    # Method 3: Check registry for uninstall information
-    registry_keys = [
-        r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-        r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall",
-    ]
+    # Method 3: Check registry for uninstall information, known keys first
+    name = _find_vscode_uninstall_key()
+    if name:
+        return True, f"Found in registry: {name}"
     
-    for registry_key in registry_keys:
+    # Scan the 64-bit view first, the 32-bit (WOW6432Node) view only on a miss
+    for view in (winreg.KEY_WOW64_64KEY, winreg.KEY_WOW64_32KEY):
         try:
-            key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, registry_key)
-            for i in range(winreg.QueryInfoKey(key)[0]):
-                try:
-                    subkey_name = winreg.EnumKey(key, i)
-                    subkey = winreg.OpenKey(key, subkey_name)
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, UNINSTALL_KEY, 0, winreg.KEY_READ | view) as key:
+                for i in range(winreg.QueryInfoKey(key)[0]):
                     try:
-                        name, _ = winreg.QueryValueEx(subkey, "DisplayName")
-                        if "Visual Studio Code" in name:
-                            winreg.CloseKey(subkey)
-                            winreg.CloseKey(key)
-                            return True, f"Foundx in registry: {name}"
+                        with winreg.OpenKey(key, winreg.EnumKey(key, i)) as subkey:
+                            name, _ = winreg.QueryValueEx(subkey, "DisplayName")
                     except OSError:
-                        pass
-                    winreg.CloseKey(subkey)
-                except OSError:
-                    continue
-            winreg.CloseKey(key)
+                        continue
+                    if "Visual Studio Code" in name:
+                        return True, f"Found in registry: {name}"
         except OSError:
             continue
     
     return False, "Not found"
 
-def check_service_running(service_name: str) -> Tuple[bool, str]:
-    """Check if a Windows service is running."""
+# Service Control Manager access rights and states (winsvc.h)
+SC_MANAGER_CONNECT = 0x0001
+SERVICE_QUERY_STATUS = 0x0004
+SERVICE_RUNNING = 4
+ERROR_SERVICE_DOES_NOT_EXIST = 1060
+
+class _ServiceStatus(ctypes.Structure):
+    _fields_ = [
+        ("dwServiceType", wintypes.DWORD),
+        ("dwCurrentState", wintypes.DWORD),
+        ("dwControlsAccepted", wintypes.DWORD),
+        ("dwWin32ExitCode", wintypes.DWORD),
+        ("dwServiceSpecificExitCode", wintypes.DWORD),
+        ("dwCheckPoint", wintypes.DWORD),
+        ("dwWaitHint", wintypes.DWORD),
+    ]
+
+@lru_cache(maxsize=None)
+def _advapi32():
+    """Load advapi32 with prototypes for the service and registry calls we use."""
+    advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)
+    advapi32.OpenSCManagerW.argtypes = [wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD]
+    advapi32.OpenSCManagerW.restype = wintypes.HANDLE
+    advapi32.OpenServiceW.argtypes = [wintypes.HANDLE, wintypes.LPCWSTR, wintypes.DWORD]
+    advapi32.OpenServiceW.restype = wintypes.HANDLE
+    advapi32.QueryServiceStatus.argtypes = [wintypes.HANDLE, ctypes.POINTER(_ServiceStatus)]
+    advapi32.QueryServiceStatus.restype = wintypes.BOOL
+    advapi32.CloseServiceHandle.argtypes = [wintypes.HANDLE]
+    advapi32.CloseServiceHandle.restype = wintypes.BOOL
+    advapi32.RegGetValueW.argtypes = [
+        wintypes.HKEY, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+        wintypes.LPDWORD, wintypes.LPVOID, wintypes.LPDWORD,
+    ]
+    advapi32.RegGetValueW.restype = wintypes.LONG
+    return advapi32
+
+@lru_cache(maxsize=1)
+def _open_scm() -> Optional[int]:
+    """Connect to the Service Control Manager once; every service query shares it.
+    
+    The handle stays open for the life of the process. Returns None if the
+    SCM cannot be reached.
+    """
     try:
-        result = subprocess.run(
-            ["sc", "query", service_name],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            if "RUNNING" in result.stdout:
-                return True, "Running"
-            else:
-                return False, "Not running"
-        else:
+        advapi32 = _advapi32()
+    except (OSError, AttributeError):
+        return None
+    return advapi32.OpenSCManagerW(None, None, SC_MANAGER_CONNECT) or None
+
+def _probe_service(service_name: str) -> Tuple[bool, str]:
+    """Query a service's state directly from the Service Control Manager."""
+    scm = _open_scm()
+    if scm is None:
+        return False, "Unable to check"
+    
+    advapi32 = _advapi32()
+    svc = advapi32.OpenServiceW(scm, service_name, SERVICE_QUERY_STATUS)
+    if not svc:
+        if ctypes.get_last_error() == ERROR_SERVICE_DOES_NOT_EXIST:
             return False, "Not installed"
-    except (subprocess.SubprocessError, FileNotFoundError):
         return False, "Unable to check"
+    try:
+        status = _ServiceStatus()
+        if not advapi32.QueryServiceStatus(svc, ctypes.byref(status)):
+            return False, "Unable to check"
+    finally:
+        advapi32.CloseServiceHandle(svc)
+    
+    if status.dwCurrentState == SERVICE_RUNNING:
+        return True, "Running"
+    return False, "Not running"
+
+def check_service_running(service_name: str) -> Tuple[bool, str]:
+    """Check if a Windows service is running."""
+    return _cached_probe(f"service {service_name}", _probe_service, service_name)
 
+# Predefined registry roots accepted in key paths like "HKLM\\SOFTWARE\\..."
+_ROOTS = {"HKLM": winreg.HKEY_LOCAL_MACHINE, "HKCU": winreg.HKEY_CURRENT_USER}
+
+# RegGetValueW flags and status codes (winreg.h / winerror.h)
+RRF_RT_ANY = 0x0000FFFF
+RRF_SUBKEY_WOW6464KEY = 0x00010000
+RRF_NOEXPAND = 0x10000000
+ERROR_SUCCESS = 0
+ERROR_MORE_DATA = 234
+
+def _reg_get_value(root_key: int, sub_key: str, value_name: str):
+    """Read a registry value from the 64-bit view with one RegGetValueW call.
+    
+    The value is converted the way winreg.QueryValueEx would (int, str, list
+    of str, or bytes). Raises OSError if the key or value does not exist.
+    """
+    advapi32 = _advapi32()
+    # Predefined HKEYs are sign-extended 32-bit values
+    hkey = wintypes.HKEY(ctypes.c_int32(root_key).value)
+    value_type = wintypes.DWORD()
+    buf = ctypes.create_string_buffer(256)
+    while True:
+        size = wintypes.DWORD(len(buf))
+        status = advapi32.RegGetValueW(
+            hkey, sub_key, value_name, RRF_RT_ANY | RRF_SUBKEY_WOW6464KEY | RRF_NOEXPAND,
+            ctypes.byref(value_type), buf, ctypes.byref(size)
+        )
+        if status == ERROR_MORE_DATA:
+            buf = ctypes.create_string_buffer(size.value)
+            continue
+        if status != ERROR_SUCCESS:
+            raise ctypes.WinError(status)
+        break
+    
+    data = buf.raw[:size.value]
+    if value_type.value in (winreg.REG_DWORD, winreg.REG_QWORD):
+        return int.from_bytes(data, "little")
+    if value_type.value in (winreg.REG_SZ, winreg.REG_EXPAND_SZ):
+        return data.decode("utf-16-le").split("\0", 1)[0]
+    if value_type.value == winreg.REG_MULTI_SZ:
+        return [item for item in data.decode("utf-16-le").split("\0") if item]
+    return data
+
+@lru_cache(maxsize=None)
 def check_registry_value(key_path: str, value_name: str, expected_value=None) -> Tuple[bool, Optional[str]]:
     """Check if a registry value exists and optionally matches expected value."""
+    root_name, _, sub_key = key_path.partition("\\")
+    root_key = _ROOTS.get(root_name)
+    if root_key is None or not sub_key:
+        return False, None
+    
     try:
-        # Parse the key path
-        if key_path.startswith("HKLM\\"):
-            root_key = winreg.HKEY_LOCAL_MACHINE
-            sub_key = key_path[5:]
-        elif key_path.startswith("HKCU\\"):
-            root_key = winreg.HKEY_CURRENT_USER
-            sub_key = key_path[5:]
-        else:
-            return False, None
-        
-        # Open and query the registry key
-        key = winreg.OpenKey(root_key, sub_key, 0, winreg.KEY_READ)
-        value, _ = winreg.QueryValueEx(key, value_name)
-        winreg.CloseKey(key)
-        
-        if expected_value is not None:
-            return value == expected_value, str(value)
-        return True, str(value)
-    except (OSError, FileNotFoundError):
+        value = _reg_get_value(root_key, sub_key, value_name)
+    except (OSError, AttributeError):
         return False, None
+    
+    if expected_value is not None:
+        return value == expected_value, str(value)
+    return True, str(value)
+
+async def _probe_python_version(version: str) -> Tuple[Optional[int], str]:
+    """Ask the py launcher for the given Python version."""
+    # Use py launcher with separate arguments
+    return await _run_probe(["py", f"-{version}", "--version"], PY_PROBE_TIMEOUT)
 
 def check_python_version(version: str) -> Tuple[bool, str]:
     """Check if a specific Python version is installed using py launcher."""
+    returncode, out = _cached_probe(f"py -{version} --version", lambda: asyncio.run(_probe_python_version(version)))
+    if returncode == 0:
+        # Get version from stdout
+        return True, out.strip()
+    return False, "Not found"
+
+# The spawned probes, as (cache key, coroutine, args); each returns (returncode, output)
+SPAWNED_PROBES = [
+    ("code --version", _probe_code_version, ()),
+    ("py -3.7 --version", _probe_python_version, ("3.7",)),
+    ("py -3.10 --version", _probe_python_version, ("3.10",)),
+]
+_SPAWNED_PROBE_KEYS = frozenset(key for key, _, _ in SPAWNED_PROBES)
+
+def batch_probe() -> Dict[str, Any]:
+    """Run the slower probes (process spawns, service queries) once, concurrently,
+    and cache the results.
+
+    The check_* helpers above read from this cache, so each probe runs at most
+    once per run.
+    """
+    # Coroutine probes all run on one event loop, so their processes overlap
+    pending = [(key, probe, args) for key, probe, args in SPAWNED_PROBES if key not in _PROBE_CACHE]
+    
+    async def gather_probes():
+        return await asyncio.gather(*(probe(*args) for _, probe, args in pending))
+    
+    if pending:
+        _PROBE_CACHE.update(zip((key for key, _, _ in pending), asyncio.run(gather_probes())))
+    
+    # The service query is an in-process API call, not a spawn
+    check_service_running("sshd")
+    return dict(_PROBE_CACHE)
+
+# Probe results are reused by a rerun within this many seconds if the fingerprint matches
+PROBE_CACHE_TTL = 60
+PROBE_CACHE_FILE = os.path.join(tempfile.gettempdir(), "carla-doctor.json")
+
+def _probe_fingerprint() -> str:
+    """Fingerprint what the probe results depend on: PATH and the Startup folder."""
     try:
-        # Use py launcher with separate arguments
-        result = subprocess.run(
-            ["py", f"-{version}", "--version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            # Get version from stdout
-            installed_version = result.stdout.strip()
-            return True, installed_version
-        else:
-            return False, "Not found"
-    except (subprocess.SubprocessError, FileNotFoundError, OSError):
-        return False, "Not found"
+        startup_mtime = os.stat(STARTUP_DIR).st_mtime_ns
+    except OSError:
+        startup_mtime = 0
+    data = ENV.get("PATH", "").encode() + str(startup_mtime).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _reusable(key: str, result) -> bool:
+    """Whether a probe result may be carried over to the next run.
+    
+    Only spawned probes that succeeded are kept. A failure or timeout is often
+    transient, and it is what the user is about to fix before rerunning, so
+    it is always probed again. The service query is in-process and cheap.
+    """
+    return key in _SPAWNED_PROBE_KEYS and result[0] == 0
+
+def _load_probe_cache(fingerprint: str) -> bool:
+    """Fill the probe cache from the previous run's results if they are still fresh."""
+    try:
+        with open(PROBE_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache["fp"] != fingerprint or time.time() - cache["ts"] >= PROBE_CACHE_TTL:
+            return False
+        _PROBE_CACHE.update({key: tuple(result) for key, result in cache["results"].items()
+                             if _reusable(key, result)})
+        return True
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+def _save_probe_cache(fingerprint: str):
+    """Persist this run's probe results for a quick rerun."""
+    try:
+        with open(PROBE_CACHE_FILE, 'w', encoding='utf-8') as f:
+            results = {key: result for key, result in _PROBE_CACHE.items() if _reusable(key, result)}
+            json.dump({"ts": time.time(), "fp": fingerprint, "results": results}, f)
+    except OSError:
+        pass
+
+@lru_cache(maxsize=None)
+def _listdir(path: str) -> Optional[Dict[str, os.DirEntry]]:
+    """List a directory once, mapping lower-cased child names to their entries.
+    
+    Returns None if the directory cannot be listed.
+    """
+    try:
+        with os.scandir(path) as entries:
+            return {entry.name.lower(): entry for entry in entries}
+    except OSError:
+        return None
+
+@lru_cache(maxsize=None)
+def _stat_cached(path: str) -> Optional[os.stat_result]:
+    """Stat a path once per run; None if it does not exist or cannot be read."""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
 
 def check_path_exists(path: str) -> bool:
     """Check if a path exists."""
-    return Path(path).exists()
+    return _stat_cached(path) is not None
 
 def check_file_exists(path: str) -> bool:
-    """Check if a file exists."""
-    p = Path(path)
-    return p.exists() and p.is_file()
+    """Check if a file exists, using its parent's cached listing."""
+    parent, name = os.path.split(path)
+    children = _listdir(parent)
+    if children is None:
+        st = _stat_cached(path)
+        return st is not None and stat.S_ISREG(st.st_mode)
+    entry = children.get(name.lower())
+    return entry is not None and entry.is_file()
 
 def check_directory_exists(path: str) -> bool:
-    """Check if a directory exists."""
-    p = Path(path)
-    return p.exists() and p.is_dir()
+    """Check if a directory exists, using its parent's cached listing."""
+    parent, name = os.path.split(path)
+    children = _listdir(parent)
+    if children is None:
+        st = _stat_cached(path)
+        return st is not None and stat.S_ISDIR(st.st_mode)
+    entry = children.get(name.lower())
+    return entry is not None and entry.is_dir()
 
-def check_env_variable(var_name: str, expected_value: str = None) -> Tuple[bool, Optional[str]]:
-    """Check if an environment variable exists and optionally matches expected value."""
-    value = os.environ.get(var_name)
+def check_env_variable(env: Dict[str, str], var_name: str, expected_value: str = None) -> Tuple[bool, Optional[str]]:
+    """Check if a variable exists in an environment snapshot and optionally matches expected value."""
+    value = env.get(var_name)
     if value is None:
         return False, None
     if expected_value is not None:
         return value.lower() == expected_value.lower(), value
     return True, value
 
+@lru_cache(maxsize=None)
 def check_startup_shortcut(shortcut_name: str) -> Tuple[bool, str]:
     """Check if a startup shortcut exists."""
-    startup_path = Path(os.path.expandvars(r"%APPDATA%\Microsoft\Windows\Start Menu\Programs\Startup"))
-    shortcut_path = startup_path / f"{shortcut_name}.lnk"
+    shortcut_file = shortcut_name + ".lnk"
     
-    if shortcut_path.exists():
-        return True, str(shortcut_path)
+    if shortcut_file.lower() in (_listdir(STARTUP_DIR) or {}):
+        return True, os.path.join(STARTUP_DIR, shortcut_file)
     return False, "Not found"
 
+# Syncthing config locations, tried in order
+SYNCTHING_CONFIG_PATHS = [
+    # Portable mode (in syncthing/config directory)
+    Path(r"C:\wvlab\syncthing\config\config.xml"),
+    # Portable mode (in syncthing directory)
+    Path(r"C:\wvlab\syncthing\config.xml"),
+    # Standard installation
+    Path(os.path.expandvars(r"%LOCALAPPDATA%\Syncthing\config.xml")),
+]
+SYNCTHING_HOST = "127.0.0.1"
+SYNCTHING_PORT = 8384
+SYNCTHING_TIMEOUT = 2
+
+_APIKEY_OPEN = b'<apikey>'
+_APIKEY_CLOSE = b'</apikey>'
+
+def _read_api_key(config_path: Path) -> Optional[str]:
+    """Read the GUI API key from a Syncthing config.xml, stopping at the apikey element."""
+    import xml.etree.ElementTree as ET
+    try:
+        with open(config_path, 'rb') as f:
+            try:
+                for _, elem in ET.iterparse(f, events=("end",)):
+                    if elem.tag == 'apikey':
+                        return elem.text
+                return None
+            except ET.ParseError:
+                # Not well-formed XML; look for the element in the raw bytes
+                f.seek(0)
+                content = f.read()
+    except OSError:
+        return None
+    start = content.find(_APIKEY_OPEN)
+    end = content.find(_APIKEY_CLOSE, start)
+    if start < 0 or end < 0:
+        return None
+    return content[start + len(_APIKEY_OPEN):end].decode('utf-8', 'replace')
+
+@lru_cache(maxsize=1)
 def get_syncthing_config() -> Tuple[bool, Optional[Dict[str, Any]]]:
     """Get Syncthing configuration via REST API."""
-    # Try multiple possible config locations
-    config_paths = [
-        # Portable mode (in syncthing/config directory)
-        Path(r"C:\wvlab\syncthing\config\config.xml"),
-        # Portable mode (in syncthing directory)
-        Path(r"C:\wvlab\syncthing\config.xml"),
-        # Standard installation
-        Path(os.path.expandvars(r"%LOCALAPPDATA%\Syncthing\config.xml")),
-    ]
-    
     api_key = None
     
-    for config_path in config_paths:
-        if config_path.exists():
-            try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Simple extraction of API key from XML
-                    match = re.search(r'<apikey>(.*?)</apikey>', content)
-                    if match:
-                        api_key = match.group(1)
-                        break
-            except Exception:
-                continue
+    for config_path in SYNCTHING_CONFIG_PATHS:
+        api_key = _read_api_key(config_path)
+        if api_key:
+            break
     
     if not api_key:
         return False, None
     
-    # Query Syncthing REST API
+    # Query Syncthing REST API; http.client is only imported once a key is found
+    import http.client
+    conn = http.client.HTTPConnection(SYNCTHING_HOST, SYNCTHING_PORT, timeout=SYNCTHING_TIMEOUT)
     try:
-        url = "http://127.0.0.1:8384/rest/config"
-        req = urllib.request.Request(url)
-        req.add_header('X-API-Key', api_key)
-        
-        with urllib.request.urlopen(req, timeout=5) as response:
-            config = json.loads(response.read().decode('utf-8'))
-            return True, config
-    except (urllib.error.URLError, urllib.error.HTTPError, TimeoutError, Exception):
+        conn.request("GET", "/rest/config", headers={"X-API-Key": api_key})
+        response = conn.getresponse()
+        if response.status != 200:
+            return False, None
+        return True, json.loads(response.read())
+    except (OSError, http.client.HTTPException, ValueError):
         return False, None
+    finally:
+        conn.close()
+
+# Expected Syncthing folder defaults, case-folded once for comparison
+EXPECTED_SYNCTHING_PATH = r"c:\wvlab".casefold()
+EXPECTED_SYNCTHING_TYPE = "receiveonly".casefold()
 
 def check_syncthing_folder_defaults(config: Optional[Dict[str, Any]]) -> Tuple[bool, str]:
     """Check if Syncthing folder defaults are configured correctly."""
@@ -275,9 +577,9 @@ def check_syncthing_folder_defaults(config: Optional[Dict[str, Any]]) -> Tuple[b
     folder_type = defaults.get('type', '')
     
     issues = []
-    if path.lower() != r"c:\wvlab":
+    if path.casefold() != EXPECTED_SYNCTHING_PATH:
         issues.append(f"Path is '{path}' (should be c:\\wvlab)")
-    if folder_type.lower() != "receiveonly":
+    if folder_type.casefold() != EXPECTED_SYNCTHING_TYPE:
         issues.append(f"Type is '{folder_type}' (should be receiveonly)")
     
     if issues:
@@ -302,188 +604,190 @@ def check_syncthing_device_auto_accept(config: Optional[Dict[str, Any]]) -> Tupl
     else:
         return False, "No devices with auto-accept enabled"
 
-def run_diagnostics():
-    """Run all diagnostic checks."""
-    print_header()
-    
-    issues = []
-    optional_issues = []
-    
-    # Platform check
-    if not check_windows():
-        print(f"{Colors.RED}Error: This script must be run on Windows.{Colors.RESET}")
-        return 1
-    
-    # Development Tools & System Settings
-    print_section("Development Tools & System Settings")
-    
-    dev_mode, _ = check_registry_value(
-        r"HKLM\SOFTWARE\Microsoft\Windows\CurrentVersion\AppModelUnlock",
-        "AllowDevelopmentWithoutDevLicense",
-        1
-    )
-    print_check("Developer Mode", dev_mode)
-    if not dev_mode:
-        issues.append("Developer Mode not enabled - Run install-devmode.ps1")
-    
-    long_paths, _ = check_registry_value(
-        r"HKLM\SYSTEM\CurrentControlSet\Control\FileSystem",
-        "LongPathsEnabled",
-        1
-    )
-    print_check("Long Paths Support", long_paths)
-    if not long_paths:
-        issues.append("Long Paths not enabled - Run install-devmode.ps1")
-    
-    git_installed = check_command_exists("git")
-    print_check("Git", git_installed)
-    if not git_installed:
-        issues.append("Git not installed - Run install-vscode-git.ps1")
-    
-    git_lfs_installed = check_command_exists("git-lfs")
-    print_check("Git LFS", git_lfs_installed)
-    if not git_lfs_installed:
-        issues.append("Git LFS not installed - Run install-vscode-git.ps1")
-    
-    vscode_installed, vscode_info = check_vscode_installed()
-    print_check("Visual Studio Code", vscode_installed)
-    if not vscode_installed:
-        issues.append("VS Code not installed - Run install-vscode-git.ps1")
-    
-    # Python Installations
-    print_section("Python Installations")
-    
-    py37_installed, py37_version = check_python_version("3.7")
-    print_check("Python 3.7", py37_installed, py37_version if py37_installed else "")
-    if not py37_installed:
-        issues.append("Python 3.7 not installed - Install from python.org")
-    
-    py310_installed, py310_version = check_python_version("3.10")
-    print_check("Python 3.10", py310_installed, py310_version if py310_installed else "")
-    if not py310_installed:
-        issues.append("Python 3.10 not installed - Install from python.org")
-    
-    # Admin Tools
-    print_section("Admin Tools")
-    
-    stignore_exists = check_file_exists(r"C:\wvlab\carla\.stignore")
-    print_check(".stignore file", stignore_exists, r"C:\wvlab\carla\.stignore")
-    if not stignore_exists:
-        issues.append(".stignore file missing in C:\\wvlab\\carla")
-    
-    syncthing_exe = check_file_exists(r"C:\wvlab\syncthing\syncthing.exe")
-    print_check("Syncthing installed", syncthing_exe, r"C:\wvlab\syncthing\syncthing.exe")
-    if not syncthing_exe:
-        issues.append("Syncthing not installed - Run install-syncthing.ps1")
-    
-    # Check Syncthing configuration via REST API
+EXPECTED_CARLA_ROOT = r"c:\wvlab\carla\carla"
+
+def check_carla_root(env: Dict[str, str]) -> Tuple[bool, str]:
+    """Check if CARLA_ROOT points at the lab CARLA install."""
+    _, value = check_env_variable(env, "CARLA_ROOT")
+    if value and value.lower() == EXPECTED_CARLA_ROOT.lower():
+        return True, f"Correctly set to: {value}"
+    if value:
+        return False, f"Currently: {value}, Should be: {EXPECTED_CARLA_ROOT}"
+    return False, f"Not set - Should be: {EXPECTED_CARLA_ROOT}"
+
+def carla_root_issue() -> str:
+    """Summary template for a failed CARLA_ROOT check: wrong value or not set at all."""
+    if ENV.get("CARLA_ROOT"):
+        return "CARLA_ROOT set incorrectly - {detail}"
+    return "CARLA_ROOT not set - Should be: " + EXPECTED_CARLA_ROOT
+
+def syncthing_config_checks() -> List[tuple]:
+    """Build the Syncthing config rows, which depend on whether its API answers."""
     syncthing_config_available, syncthing_config = get_syncthing_config()
-    
-    if syncthing_config_available:
-        # Check folder defaults
-        folder_defaults_ok, folder_defaults_msg = check_syncthing_folder_defaults(syncthing_config)
-        print_check("Syncthing folder defaults", folder_defaults_ok, folder_defaults_msg)
-        if not folder_defaults_ok:
-            issues.append(f"Syncthing folder defaults incorrect - {folder_defaults_msg}")
-        
-        # Check device auto-accept
-        auto_accept_ok, auto_accept_msg = check_syncthing_device_auto_accept(syncthing_config)
-        print_check("Syncthing device auto-accept", auto_accept_ok, auto_accept_msg)
-        if not auto_accept_ok:
-            issues.append(f"Syncthing device auto-accept not configured - {auto_accept_msg}")
-    else:
-        print_check("Syncthing configuration", False, "Cannot access Syncthing API (is it running?)")
-        issues.append("Syncthing configuration cannot be verified - Ensure Syncthing is running")
-    
-    ssh_running, ssh_status = check_service_running("sshd")
-    print_check("OpenSSH Server", ssh_running, ssh_status, optional=not ssh_running)
-    if not ssh_running:
-        optional_issues.append("OpenSSH Server not running - Run install-ssh-wsl.ps1 (optional)")
-    
-    wsl_installed = check_command_exists("wsl")
-    print_check("WSL", wsl_installed, optional=not wsl_installed)
-    if not wsl_installed:
-        optional_issues.append("WSL not installed - Run install-ssh-wsl.ps1 (optional)")
-    
-    # CARLA Lab Folders & Configuration
-    print_section("CARLA Lab Folders & Configuration")
-    
-    folders_to_check = [
-        (r"C:\wvlab", "WVLab root"),
-        (r"C:\wvlab\carla", "Runtime folder"),
+    if not syncthing_config_available:
+        return [
+            ("Syncthing configuration", lambda: False, (), "Cannot access Syncthing API (is it running?)",
+             "Syncthing configuration cannot be verified - Ensure Syncthing is running", False),
+        ]
+    return [
+        ("Syncthing folder defaults", check_syncthing_folder_defaults, (syncthing_config,), "{detail}",
+         "Syncthing folder defaults incorrect - {detail}", False),
+        ("Syncthing device auto-accept", check_syncthing_device_auto_accept, (syncthing_config,), "{detail}",
+         "Syncthing device auto-accept not configured - {detail}", False),
     ]
+
+# Issue templates shared by several rows
+TPL_MISSING_FOLDER = "{name} missing - Run install-wvlab-folders.ps1"
+TPL_MISSING_VENV = r"{name} missing - Run: c:\wvlab\carla\source\SCSU\setup_external_venv.ps1"
+
+# Message column value that shows the check's detail text only when it passed
+DETAIL_IF_OK = object()
+
+# Sections of (name, check, args, message, issue, optional) rows. A check returns
+# either a bool or (bool, detail). message is formatted with {detail}; issue is
+# a template rendered with {name} and {detail} only when the summary prints it,
+# or a callable returning that template when the wording depends on the failure.
+# Failed optional rows are reported as optional items. A callable in place of a
+# row is called at run time and returns more rows.
+CHECKS = [
+    ("Development Tools & System Settings", [
+        ("Developer Mode", check_registry_value,
+         (r"HKLM\SOFTWARE\Microsoft\Windows\CurrentVersion\AppModelUnlock", "AllowDevelopmentWithoutDevLicense", 1),
+         "", "Developer Mode not enabled - Run install-devmode.ps1", False),
+        ("Long Paths Support", check_registry_value,
+         (r"HKLM\SYSTEM\CurrentControlSet\Control\FileSystem", "LongPathsEnabled", 1),
+         "", "Long Paths not enabled - Run install-devmode.ps1", False),
+        ("Git", check_command_exists, ("git",), "", "Git not installed - Run install-vscode-git.ps1", False),
+        ("Git LFS", check_command_exists, ("git-lfs",), "", "Git LFS not installed - Run install-vscode-git.ps1", False),
+        ("Visual Studio Code", check_vscode_installed, (), "", "VS Code not installed - Run install-vscode-git.ps1", False),
+    ]),
+    ("Python Installations", [
+        ("Python 3.7", check_python_version, ("3.7",), DETAIL_IF_OK, "Python 3.7 not installed - Install from python.org", False),
+        ("Python 3.10", check_python_version, ("3.10",), DETAIL_IF_OK, "Python 3.10 not installed - Install from python.org", False),
+    ]),
+    ("Admin Tools", [
+        (".stignore file", check_file_exists, (r"C:\wvlab\carla\.stignore",), r"C:\wvlab\carla\.stignore",
+         r".stignore file missing in C:\wvlab\carla", False),
+        ("Syncthing installed", check_file_exists, (r"C:\wvlab\syncthing\syncthing.exe",), r"C:\wvlab\syncthing\syncthing.exe",
+         "Syncthing not installed - Run install-syncthing.ps1", False),
+        syncthing_config_checks,
+        ("OpenSSH Server", check_service_running, ("sshd",), "{detail}",
+         "OpenSSH Server not running - Run install-ssh-wsl.ps1 (optional)", True),
+        ("WSL", check_command_exists, ("wsl",), "", "WSL not installed - Run install-ssh-wsl.ps1 (optional)", True),
+    ]),
+    ("CARLA Lab Folders & Configuration", [
+        ("WVLab root", check_directory_exists, (r"C:\wvlab",), r"C:\wvlab",
+         TPL_MISSING_FOLDER, False),
+        ("Runtime folder", check_directory_exists, (r"C:\wvlab\carla",), r"C:\wvlab\carla",
+         TPL_MISSING_FOLDER, False),
+        ("CARLA_ROOT env variable", check_carla_root, (ENV,), "{detail}", carla_root_issue, False),
+    ]),
+    ("Virtual Environments", [
+        ("venv-carla", check_directory_exists, (r"C:\wvlab\venv-carla",), r"C:\wvlab\venv-carla",
+         TPL_MISSING_VENV, False),
+        ("venv-orchestrator", check_directory_exists, (r"C:\wvlab\venv-orchestrator",), r"C:\wvlab\venv-orchestrator",
+         TPL_MISSING_VENV, False),
+    ]),
+    ("Startup Configuration", [
+        ("Syncthing startup shortcut", check_startup_shortcut, ("Syncthing",), DETAIL_IF_OK,
+         "Syncthing startup shortcut missing - Run install-syncthing.ps1", False),
+        ("run_agent startup shortcut", check_startup_shortcut, ("run_agent",), DETAIL_IF_OK,
+         "run_agent startup shortcut missing", False),
+    ]),
+]
+
+# Checks are independent and mostly wait on the OS, so they run on a thread pool
+CHECK_WORKERS = 16
+
+def _run_row(row) -> List[tuple]:
+    """Run one table row, or every row a callable row expands to, as one task.
     
-    for folder_path, folder_name in folders_to_check:
-        exists = check_directory_exists(folder_path)
-        print_check(folder_name, exists, folder_path)
-        if not exists:
-            issues.append(f"{folder_name} missing - Run install-wvlab-folders.ps1")
-    
-    carla_root_set, carla_root_value = check_env_variable("CARLA_ROOT")
-    expected_carla_root = r"c:\wvlab\carla\carla"
-    carla_root_correct = carla_root_set and carla_root_value and carla_root_value.lower() == expected_carla_root.lower()
-    
-    if carla_root_correct:
-        print_check("CARLA_ROOT env variable", True, f"Correctly set to: {carla_root_value}")
-    elif carla_root_value:
-        print_check("CARLA_ROOT env variable", False, f"Currently: {carla_root_value}, Should be: {expected_carla_root}")
-        issues.append(f"CARLA_ROOT set incorrectly - Currently: {carla_root_value}, Should be: {expected_carla_root}")
-    else:
-        print_check("CARLA_ROOT env variable", False, f"Not set - Should be: {expected_carla_root}")
-        issues.append(f"CARLA_ROOT not set - Should be: {expected_carla_root}")
-    
-    # Virtual Environments
-    print_section("Virtual Environments")
-    
-    venv_carla_exists = check_directory_exists(r"C:\wvlab\venv-carla")
-    print_check("venv-carla", venv_carla_exists, r"C:\wvlab\venv-carla")
-    if not venv_carla_exists:
-        issues.append(r"venv-carla missing - Run: c:\wvlab\carla\source\SCSU\setup_external_venv.ps1")
-    
-    venv_orchestrator_exists = check_directory_exists(r"C:\wvlab\venv-orchestrator")
-    print_check("venv-orchestrator", venv_orchestrator_exists, r"C:\wvlab\venv-orchestrator")
-    if not venv_orchestrator_exists:
-        issues.append(r"venv-orchestrator missing - Run: c:\wvlab\carla\source\SCSU\setup_external_venv.ps1")
-    
-    # Startup Shortcuts
-    print_section("Startup Configuration")
-    
-    syncthing_startup, startup_path = check_startup_shortcut("Syncthing")
-    print_check("Syncthing startup shortcut", syncthing_startup, startup_path if syncthing_startup else "")
-    if not syncthing_startup:
-        issues.append("Syncthing startup shortcut missing - Run install-syncthing.ps1")
-    
-    agent_startup, agent_path = check_startup_shortcut("run_agent")
-    print_check("run_agent startup shortcut", agent_startup, agent_path if agent_startup else "")
-    if not agent_startup:
-        issues.append("run_agent startup shortcut missing")
-    
-    # Summary
-    print(f"\n{Colors.CYAN}{'=' * 70}{Colors.RESET}")
-    print(f"{Colors.BOLD}Summary{Colors.RESET}")
-    print(f"{Colors.CYAN}{'=' * 70}{Colors.RESET}\n")
+    Returns [(row, result)] so the dependent rows stay together and in order.
+    """
+    rows = row() if callable(row) else [row]
+    return [(expanded, expanded[1](*expanded[2])) for expanded in rows]
+
+def flush_lines(lines: List[str]):
+    """Write the buffered report lines to stdout in one call and empty the buffer."""
+    sys.stdout.write("".join(lines))
+    sys.stdout.flush()
+    lines.clear()
+
+def _add_section(title: str, section, lines: List[str], issues: List[tuple], optional_issues: List[tuple]):
+    """Append one section's report lines and collect its failed rows."""
+    lines.append(format_section(title))
+    for row_results in section:
+        for (name, check, args, message, issue, optional), result in row_results:
+            ok, detail = result if isinstance(result, tuple) else (result, "")
+            # Only table templates are formatted; detail is the check's own text and may hold braces
+            text = (detail if ok else "") if message is DETAIL_IF_OK else message.format(detail=detail)
+            lines.append(format_check(name, ok, text, optional=optional and not ok))
+            if not ok:
+                tpl = issue() if callable(issue) else issue
+                (optional_issues if optional else issues).append((tpl, name, detail))
+
+def run_table(checks, lines: List[str]) -> Tuple[List[tuple], List[tuple]]:
+    """Run every row in a checks table, appending report lines to lines.
+    
+    The checks run concurrently; the report is assembled in table order and
+    flushed once per section as each section's results arrive. Returns
+    (issues, optional_issues) for the summary, as unrendered
+    (template, name, detail) entries.
+    """
+    issues = []
+    optional_issues = []
+    with ThreadPoolExecutor(max_workers=CHECK_WORKERS) as pool:
+        # Submit every section before collecting any, so they all overlap
+        pending = [pool.map(_run_row, rows) for _, rows in checks]
+        for (title, _), section in zip(checks, pending):
+            _add_section(title, section, lines, issues, optional_issues)
+            flush_lines(lines)
+    return issues, optional_issues
+
+def format_summary(issues: List[tuple], optional_issues: List[tuple]) -> str:
+    """Format the summary block listing every issue found."""
+    lines = [SUMMARY_HEADER]
     
     if not issues and not optional_issues:
-        print(f"{Colors.GREEN}{Colors.BOLD}✓ All checks passed! Your CARLA client station is fully configured.{Colors.RESET}\n")
-        return 0
+        lines.append(f"{Colors.GREEN}{Colors.BOLD}✓ All checks passed! Your CARLA client station is fully configured.{Colors.RESET}\n\n")
+        return "".join(lines)
     
     if issues:
-        print(f"{Colors.RED}{Colors.BOLD}✗ {len(issues)} issue(s) found:{Colors.RESET}\n")
-        for i, issue in enumerate(issues, 1):
-            print(f"  {i}. {issue}")
-        print()
+        lines.append(f"{Colors.RED}{Colors.BOLD}✗ {len(issues)} issue(s) found:{Colors.RESET}\n\n")
+        lines.extend(f"  {i}. {tpl.format(name=name, detail=detail)}\n"
+                     for i, (tpl, name, detail) in enumerate(issues, 1))
+        lines.append("\n")
     
     if optional_issues:
-        print(f"{Colors.YELLOW}{Colors.BOLD}! {len(optional_issues)} optional item(s):{Colors.RESET}\n")
-        for i, issue in enumerate(optional_issues, 1):
-            print(f"  {i}. {issue}")
-        print()
+        lines.append(f"{Colors.YELLOW}{Colors.BOLD}! {len(optional_issues)} optional item(s):{Colors.RESET}\n\n")
+        lines.extend(f"  {i}. {tpl.format(name=name, detail=detail)}\n"
+                     for i, (tpl, name, detail) in enumerate(optional_issues, 1))
+        lines.append("\n")
+    
+    return "".join(lines)
+
+def run_diagnostics(use_cache: bool = True):
+    """Run all diagnostic checks."""
+    # The report is buffered and written once per section, not once per line
+    lines = [format_header()]
+    flush_lines(lines)
+    
+    # Spawn all subprocess-bound probes up front; the checks below read the cache.
+    # A rerun within PROBE_CACHE_TTL seconds reuses the previous run's results.
+    fingerprint = _probe_fingerprint()
+    if not (use_cache and _load_probe_cache(fingerprint)):
+        batch_probe()
+        _save_probe_cache(fingerprint)
+    
+    issues, optional_issues = run_table(CHECKS, lines)
+    lines.append(format_summary(issues, optional_issues))
+    flush_lines(lines)
     
     return 1 if issues else 0
 
 if __name__ == "__main__":
     try:
-        sys.exit(run_diagnostics())
+        sys.exit(run_diagnostics(use_cache="--no-cache" not in sys.argv[1:]))
     except KeyboardInterrupt:
         print(f"\n{Colors.YELLOW}Diagnostic interrupted.{Colors.RESET}")
         sys.exit(130)
@@ -2,17 +2,30 @@
 import os
 import sys
 import time
+import heapq
+import asyncio
 import uuid
 import signal
+import itertools
 import threading
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime, timezone
 from typing import Dict, Optional, List
 
 import psutil
-from fastapi import FastAPI, HTTPException, Header, Depends
-from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Header, Depends, Response
+from pydantic import BaseModel, Field, TypeAdapter
 import subprocess
 
+# Optional: pywin32 Job Objects give kernel-level tree kill on Windows
+try:
+    import pywintypes
+    import win32api
+    import win32con
+    import win32job
+except ImportError:
+    win32job = None
+
 # ---------- Config ----------
 # Read a shared bearer token from env (set this on each client)
 AUTH_TOKEN = os.environ.get("CARLA_AGENT_TOKEN", "change-me")
@@ -24,7 +37,18 @@ METRICS_INTERVAL = float(os.environ.get("CARLA_AGENT_METRICS_INTERVAL", "2.0"))
 HUNG_CPU_PCT = float(os.environ.get("CARLA_AGENT_HUNG_CPU_PCT", "1.0"))
 HUNG_SECS = float(os.environ.get("CARLA_AGENT_HUNG_SECS", "30.0"))
 
-app = FastAPI(title="CARLA Orchestrator Agent", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The metrics loop only runs while the server does, not on a bare `import agent`
+    task = asyncio.create_task(_metrics_loop())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+app = FastAPI(title="CARLA Orchestrator Agent", version="0.1.0", lifespan=lifespan)
 
 def require_auth(authorization: Optional[str] = Header(None)):
     if AUTH_TOKEN == "change-me":
@@ -65,12 +89,18 @@ class ProcInfo(BaseModel):
     stdout_log: Optional[str]
     stderr_log: Optional[str]
 
+# Serializer for /status, built once
+_PROC_INFO_LIST = TypeAdapter(List[ProcInfo])
+
 class StartResponse(BaseModel):
     job_id: str
     pid: int
     stdout_log: Optional[str]
     stderr_log: Optional[str]
 
+def _utc_iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
 # In-memory job table
 class _Job:
     def __init__(self, job_id: str, popen: subprocess.Popen, cwd: Optional[str], logs):
@@ -79,13 +109,27 @@ class _Job:
         self.cwd = cwd
         self.log_paths = logs  # (stdout_path, stderr_path) - for reporting
         self.log_files = None  # Will store (stdout_file, stderr_file) file objects
+        self.hjob = None  # Windows Job Object holding the process tree, if available
         self.start_ts = time.time()
+        self.start_time_utc = _utc_iso(self.start_ts)  # fixed for the life of the job
         self.last_cpu_active_ts = self.start_ts
+        self._last_cpu_active_utc = (self.start_ts, self.start_time_utc)  # (ts, iso) memo
         self.cpu_percent = 0.0
         self.mem_mb = 0.0
         self.is_hung = False
         self.cmdline = popen.args if isinstance(popen.args, list) else [str(popen.args)]
         self.lock = threading.Lock()
+        # Serializes kill escalations (hjob, log_files); separate so snapshot() never waits on a kill
+        self.kill_lock = threading.Lock()
+        # Set once psutil reports the process gone from the process table
+        self.gone = False
+        # One psutil handle per job, kept for the non-blocking cpu_percent() deltas
+        try:
+            self._psproc = psutil.Process(popen.pid)
+            self._psproc.cpu_percent(None)  # prime; the first call always returns 0.0
+        except psutil.NoSuchProcess:
+            self._psproc = None
+            self.gone = True
 
     def close_logs(self):
         """Close log file handles if open."""
@@ -102,63 +146,125 @@ class _Job:
                 pass
             self.log_files = None
 
-    def snapshot(self) -> ProcInfo:
+    def close_job_object(self):
+        """Close the Job Object handle; KILL_ON_JOB_CLOSE ends anything still in it."""
+        if self.hjob is not None:
+            try:
+                win32api.CloseHandle(self.hjob)
+            except pywintypes.error:
+                pass
+            self.hjob = None
+
+    def sample(self):
+        """Refresh the cached CPU/memory/hung fields; called from the metrics loop."""
         with self.lock:
+            if self.gone:
+                return
             try:
-                p = psutil.Process(self.popen.pid)
-                cpu = p.cpu_percent(interval=0.1)  # Measure over 100ms for accurate reading
-                mem = p.memory_info().rss / (1024*1024)
-                now = time.time()
-                if cpu > HUNG_CPU_PCT:
-                    self.last_cpu_active_ts = now
-                self.cpu_percent = cpu
-                self.mem_mb = mem
-                hung_elapsed = now - self.last_cpu_active_ts
-                self.is_hung = (hung_elapsed >= HUNG_SECS)
-                status = "running"
-                ret = None
-                if self.popen.poll() is not None:
-                    status = "exited"
-                    ret = self.popen.returncode
-                return ProcInfo(
-                    job_id=self.job_id,
-                    pid=self.popen.pid,
-                    status=status,
-                    returncode=ret,
-                    start_time_utc=datetime.fromtimestamp(self.start_ts, tz=timezone.utc).isoformat(),
-                    uptime_sec=now - self.start_ts,
-                    cpu_percent=self.cpu_percent,
-                    mem_mb=self.mem_mb,
-                    last_cpu_active_utc=datetime.fromtimestamp(self.last_cpu_active_ts, tz=timezone.utc).isoformat(),
-                    is_hung=self.is_hung,
-                    cmdline=[str(c) for c in self.cmdline],
-                    cwd=self.cwd,
-                    stdout_log=self.log_paths[0] if self.log_paths else None,
-                    stderr_log=self.log_paths[1] if self.log_paths else None,
-                )
+                # oneshot() lets both readings share one read of the process's stats
+                with self._psproc.oneshot():
+                    cpu = self._psproc.cpu_percent(None)  # % since the previous sample, no sleep
+                    mem = self._psproc.memory_info().rss / (1024*1024)
             except psutil.NoSuchProcess:
-                # Process no longer exists in process table, but popen may still have returncode
-                ret = self.popen.poll()
-                return ProcInfo(
-                    job_id=self.job_id,
-                    pid=self.popen.pid,
-                    status="exited" if ret is not None else "unknown",
-                    returncode=ret,
-                    start_time_utc=datetime.fromtimestamp(self.start_ts, tz=timezone.utc).isoformat(),
-                    uptime_sec=max(0.0, time.time() - self.start_ts),
-                    cpu_percent=0.0,
-                    mem_mb=0.0,
-                    last_cpu_active_utc=datetime.fromtimestamp(self.last_cpu_active_ts, tz=timezone.utc).isoformat(),
-                    is_hung=True,
-                    cmdline=[str(c) for c in self.cmdline],
-                    cwd=self.cwd,
-                    stdout_log=self.log_paths[0] if self.log_paths else None,
-                    stderr_log=self.log_paths[1] if self.log_paths else None,
-                )
+                self.gone = True
+                self.cpu_percent = 0.0
+                self.mem_mb = 0.0
+                self.is_hung = True
+                return
+            except psutil.AccessDenied:
+                return  # keep the previous sample; never let this kill the metrics thread
+            now = time.time()
+            if cpu > HUNG_CPU_PCT:
+                self.last_cpu_active_ts = now
+            self.cpu_percent = cpu
+            self.mem_mb = mem
+            self.is_hung = (now - self.last_cpu_active_ts) >= HUNG_SECS
+
+    def last_cpu_active_utc(self) -> str:
+        """ISO string for last_cpu_active_ts, reformatted only when the timestamp moves."""
+        ts, iso = self._last_cpu_active_utc
+        if ts != self.last_cpu_active_ts:
+            ts = self.last_cpu_active_ts
+            iso = _utc_iso(ts)
+            self._last_cpu_active_utc = (ts, iso)
+        return iso
+
+    def snapshot(self) -> ProcInfo:
+        """Report the job from the fields cached by sample(); no psutil calls."""
+        with self.lock:
+            ret = self.popen.poll()
+            if ret is not None:
+                status = "exited"
+            elif self.gone:
+                # Process no longer exists in process table and popen has no returncode
+                status = "unknown"
+            else:
+                status = "running"
+            if status == "running":
+                cpu, mem, hung = self.cpu_percent, self.mem_mb, self.is_hung
+            else:
+                # Sampling stops at exit; don't report the last live sample for a dead process
+                cpu, mem, hung = 0.0, 0.0, True
+            return ProcInfo.model_construct(
+                job_id=self.job_id,
+                pid=self.popen.pid,
+                status=status,
+                returncode=ret,
+                start_time_utc=self.start_time_utc,
+                uptime_sec=max(0.0, time.time() - self.start_ts),
+                cpu_percent=cpu,
+                mem_mb=mem,
+                last_cpu_active_utc=self.last_cpu_active_utc(),
+                is_hung=hung,
+                cmdline=[str(c) for c in self.cmdline],
+                cwd=self.cwd,
+                stdout_log=self.log_paths[0] if self.log_paths else None,
+                stderr_log=self.log_paths[1] if self.log_paths else None,
+            )
 
 JOBS: Dict[str, _Job] = {}
 JOBS_LOCK = threading.Lock()
 
+# Exited jobs stay listed for inspection until this long after they started
+JOB_RETENTION_SECS = 3600.0
+# A job still running (or with processes left in its Job Object) when its retention
+# is up is looked at again this much later
+PRUNE_RECHECK_SECS = 60.0
+
+# Min-heap of (prune_due_ts, seq, job), guarded by JOBS_LOCK; seq breaks ties
+_PRUNE_HEAP: List[tuple] = []
+_PRUNE_SEQ = itertools.count()
+
+def _schedule_prune(job: _Job, due_ts: float):
+    heapq.heappush(_PRUNE_HEAP, (due_ts, next(_PRUNE_SEQ), job))
+
+def _prune_due(now: float):
+    """Drop exited jobs whose retention is up; only due heap entries are looked at.
+    Call with JOBS_LOCK held.
+    """
+    while _PRUNE_HEAP and _PRUNE_HEAP[0][0] <= now:
+        _, _, job = heapq.heappop(_PRUNE_HEAP)
+        if JOBS.get(job.job_id) is not job:
+            continue  # already replaced or removed
+        if job.popen.poll() is None:
+            _schedule_prune(job, now + PRUNE_RECHECK_SECS)
+            continue
+        # Closing the Job Object kills whatever is left in it (KILL_ON_JOB_CLOSE), e.g. the
+        # game a launcher started before exiting; only an explicit stop may do that
+        if job.hjob is not None and _job_object_procs(job):
+            _schedule_prune(job, now + PRUNE_RECHECK_SECS)
+            continue
+        # A kill in progress owns the handles; look again later rather than wait under JOBS_LOCK
+        if not job.kill_lock.acquire(blocking=False):
+            _schedule_prune(job, now + PRUNE_RECHECK_SECS)
+            continue
+        try:
+            job.close_logs()
+            job.close_job_object()
+        finally:
+            job.kill_lock.release()
+        JOBS.pop(job.job_id, None)
+
 def _windows_creationflags():
     flags = 0
     # CREATE_NEW_PROCESS_GROUP allows clean tree killing via psutil
@@ -169,6 +275,28 @@ def _windows_creationflags():
         flags |= subprocess.CREATE_NO_WINDOW
     return flags
 
+def _create_job_object(pid: int):
+    """Put pid in a new Job Object that kills every process in it when it is closed.
+    Children the process spawns later join the job automatically.
+    Returns the job handle, or None without pywin32 or if the process cannot be assigned.
+    """
+    if win32job is None:
+        return None
+    try:
+        hjob = win32job.CreateJobObject(None, "")
+        info = win32job.QueryInformationJobObject(hjob, win32job.JobObjectExtendedLimitInformation)
+        info["BasicLimitInformation"]["LimitFlags"] |= win32job.JOB_OBJECT_LIMIT_KILL_ON_JOB_CLOSE
+        win32job.SetInformationJobObject(hjob, win32job.JobObjectExtendedLimitInformation, info)
+        hproc = win32api.OpenProcess(win32con.PROCESS_SET_QUOTA | win32con.PROCESS_TERMINATE, False, pid)
+        try:
+            win32job.AssignProcessToJobObject(hjob, hproc)
+        finally:
+            win32api.CloseHandle(hproc)
+        return hjob
+    except pywintypes.error as e:
+        print(f"[WARN] Could not create Job Object for PID {pid}: {e}", flush=True)
+        return None
+
 def _open_logs(log_dir: Optional[str], job_id: str):
     if not log_dir:
         return None
@@ -178,33 +306,51 @@ def _open_logs(log_dir: Optional[str], job_id: str):
     return (stdout_path, stderr_path)
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok", "time_utc": datetime.now(timezone.utc).isoformat(), "jobs": len(JOBS)}
 
+def _wait_job_exit(job: _Job, timeout: float) -> bool:
+    """Block until the job's process exits. Returns False if it is still running after timeout seconds.
+    Popen.wait is a single kernel wait on the process handle on Windows, with no polling.
+    """
+    try:
+        job.popen.wait(timeout=timeout)
+        return True
+    except subprocess.TimeoutExpired:
+        return False
+
+# start_job stays a sync endpoint: Popen and the old-job wait block, so it runs on
+# the threadpool while the async endpoints below keep answering on the event loop
 @app.post("/start", response_model=StartResponse, dependencies=[Depends(require_auth)])
 def start_job(req: StartRequest):
     job_id = req.job_id or str(uuid.uuid4())
+    old_job = None
     with JOBS_LOCK:
         if req.kill_existing and job_id in JOBS:
-            old_job = JOBS[job_id]
-            _kill_job(old_job, mode="tree_kill")
-            JOBS.pop(job_id, None)
-            # Wait for PID to actually exit to prevent port/resource conflicts
-            old_pid = old_job.popen.pid
-            deadline = time.time() + 15.0
-            while time.time() < deadline:
-                if not psutil.pid_exists(old_pid):
-                    break
-                time.sleep(0.2)
-            else:
-                print(f"[WARN] Old job {job_id} PID {old_pid} still exists after 15s", flush=True)
+            old_job = JOBS.pop(job_id)
         elif job_id in JOBS:
             raise HTTPException(status_code=409, detail=f"job_id '{job_id}' already exists")
 
+    # Kill and wait outside JOBS_LOCK so other requests are not held up meanwhile
+    if old_job is not None:
+        _kill_job(old_job, mode="tree_kill")
+        # Wait for PID to actually exit to prevent port/resource conflicts
+        if not _wait_job_exit(old_job, timeout=15.0):
+            print(f"[WARN] Old job {job_id} PID {old_job.popen.pid} still exists after 15s", flush=True)
+        # The old job is no longer in JOBS, so the prune will never close its handle
+        with old_job.kill_lock:
+            old_job.close_job_object()
+
+    with JOBS_LOCK:
+        # Another /start may have claimed this job_id while we waited
+        if job_id in JOBS:
+            raise HTTPException(status_code=409, detail=f"job_id '{job_id}' already exists")
+
         log_paths = _open_logs(req.log_dir, job_id)
-        # Open log files with UTF-8 encoding in text mode to handle Unicode characters
-        stdout_file = open(log_paths[0], "a", encoding="utf-8", buffering=1) if log_paths else None
-        stderr_file = open(log_paths[1], "a", encoding="utf-8", buffering=1) if log_paths else None
+        # The child writes straight to the inherited fd, so the agent-side handle only needs
+        # to be a raw unbuffered append; encoding and line flushing are up to the child
+        stdout_file = open(log_paths[0], "ab", buffering=0) if log_paths else None
+        stderr_file = open(log_paths[1], "ab", buffering=0) if log_paths else None
 
         env = os.environ.copy()
         if req.env:
@@ -234,18 +380,99 @@ def start_job(req: StartRequest):
 
         job = _Job(job_id, popen, req.cwd, log_paths)
         job.log_files = (stdout_file, stderr_file) if log_paths else None
+        if os.name == "nt":
+            job.hjob = _create_job_object(popen.pid)
         JOBS[job_id] = job
+        _schedule_prune(job, job.start_ts + JOB_RETENTION_SECS)
 
     return StartResponse(job_id=job_id, pid=popen.pid, stdout_log=log_paths[0] if log_paths else None, stderr_log=log_paths[1] if log_paths else None)
 
+CARLA_PROC_KEYWORDS = ('carlaue4', 'bootstrappackagedgame', 'ue4editor')
+
+def _find_carla_strays(job: _Job) -> List[psutil.Process]:
+    """Find CarlaUE4 processes that may have been spawned by this job outside its tree,
+    by name and by having started within 60 seconds of the job.
+    """
+    strays = []
+    try:
+        job_start_time = job.start_ts
+        # Only ask for the cheap fields up front; exe needs a handle on each process
+        for proc in psutil.process_iter(['name', 'create_time']):
+            try:
+                # Check if it was created after this job started (within 60 seconds)
+                proc_start = proc.info.get('create_time') or 0
+                if not (job_start_time - 5 <= proc_start <= job_start_time + 60):
+                    continue
+
+                # Check if it's a CARLA process, reading exe only for the few in the window
+                proc_name = (proc.info.get('name') or '').lower()
+                if not any(keyword in proc_name for keyword in CARLA_PROC_KEYWORDS):
+                    proc_exe = (proc.exe() or '').lower()
+                    if not any(keyword in proc_exe for keyword in CARLA_PROC_KEYWORDS):
+                        continue
+
+                # This is likely spawned by our job
+                strays.append(proc)
+
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+    except Exception:
+        pass  # Continue with what we have
+    return strays
+
+def _job_object_procs(job: _Job) -> List[psutil.Process]:
+    """List the processes currently in the job's Job Object."""
+    try:
+        pids = win32job.QueryInformationJobObject(job.hjob, win32job.JobObjectBasicProcessIdList)
+    except pywintypes.error:
+        return []
+    procs = []
+    for pid in pids:
+        try:
+            procs.append(psutil.Process(pid))
+        except psutil.NoSuchProcess:
+            continue
+    return procs
+
+def _taskkill_tree(pid: int):
+    """Force-kill pid and all its descendants with taskkill /T (Windows)."""
+    try:
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        pass  # Fall back to the per-process kills
+
+def _wait_tree_exit(job: _Job, procs: List[psutil.Process]) -> List[psutil.Process]:
+    """Wait for the job's root process, then give the rest of the tree a short grace period.
+    Returns the processes still alive. procs[0] is the root.
+    """
+    root_gone = _wait_job_exit(job, timeout=2.0)
+    # Descendants were signalled together with the root and have mostly exited by now;
+    # wait_procs polls, so keep its window short
+    _, alive = psutil.wait_procs(procs[1:], timeout=0.5)
+    if not root_gone:
+        alive.insert(0, procs[0])
+    return alive
+
 def _kill_job(job: _Job, mode: str = "term") -> bool:
     """Kill a job process, escalating through terminate -> kill -> tree_kill.
     Returns True if process confirmed dead, False if still alive after all attempts.
+    Overlapping kills of the same job (/stop, /stop_all, kill_existing) run one at a time.
     """
+    with job.kill_lock:
+        return _kill_job_locked(job, mode)
+
+def _kill_job_locked(job: _Job, mode: str) -> bool:
     try:
         p = psutil.Process(job.popen.pid)
     except psutil.NoSuchProcess:
         job.close_logs()  # Clean up file handles
+        job.close_job_object()  # Ends any descendants the job left behind
         return True  # Already dead
 
     # First, collect all descendants including those in different process groups
@@ -256,30 +483,12 @@ def _kill_job(job: _Job, mode: str = "term") -> bool:
     except (psutil.NoSuchProcess, psutil.AccessDenied):
         all_procs = [p]
     
-    # Also check for CarlaUE4 processes that may have been spawned by this job
-    # by checking command line arguments or timing heuristics
-    try:
-        job_start_time = job.start_ts
-        for proc in psutil.process_iter(['pid', 'name', 'exe', 'create_time', 'cmdline']):
-            try:
-                proc_name = proc.info.get('name', '').lower()
-                proc_exe = (proc.info.get('exe') or '').lower()
-                
-                # Check if it's a CARLA process
-                if any(keyword in proc_name or keyword in proc_exe for keyword in 
-                       ['carlaue4', 'bootstrappackagedgame', 'ue4editor']):
-                    
-                    # Check if it was created after this job started (within 60 seconds)
-                    proc_start = proc.info.get('create_time', 0)
-                    if proc_start >= job_start_time - 5 and proc_start <= job_start_time + 60:
-                        # This is likely spawned by our job
-                        if proc.pid not in [p.pid for p in all_procs]:
-                            all_procs.append(proc)
-                            
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-    except Exception:
-        pass  # Continue with what we have
+    # CARLA launchers can start the game outside this tree (Windows only). A Job
+    # Object lists every descendant directly, so the name scan is only the fallback.
+    if os.name == "nt":
+        known = {proc.pid for proc in all_procs}
+        strays = _job_object_procs(job) if job.hjob is not None else _find_carla_strays(job)
+        all_procs += [proc for proc in strays if proc.pid not in known]
 
     # Try terminate first (soft stop)
     if mode in ("term", "kill", "tree_kill"):
@@ -289,30 +498,41 @@ def _kill_job(job: _Job, mode: str = "term") -> bool:
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 pass
         
-        # Wait for all to terminate
-        gone, alive = psutil.wait_procs(all_procs, timeout=5.0)
+        alive = _wait_tree_exit(job, all_procs)
         if not alive:
             job.close_logs()
+            job.close_job_object()
             return True  # All terminated successfully
 
     # Escalate to kill (hard stop)
     if mode in ("kill", "tree_kill"):
-        for proc in alive if mode in ("kill", "tree_kill") else all_procs:
+        if job.hjob is not None:
+            # Ends every process in the job, including ones outside the pid tree
+            try:
+                win32job.TerminateJobObject(job.hjob, 1)
+            except pywintypes.error:
+                pass
+            job.close_job_object()
+        elif os.name == "nt":
+            # taskkill walks and force-kills the whole tree natively in one call
+            _taskkill_tree(job.popen.pid)
+        for proc in alive:
             try:
                 proc.kill()
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 pass
         
-        # Wait for all to be killed
-        gone, alive = psutil.wait_procs(all_procs, timeout=5.0)
+        alive = _wait_tree_exit(job, all_procs)
         if not alive:
             job.close_logs()
+            job.close_job_object()
             return True  # All killed successfully
     
     # Check if any are still alive
     try:
         if not psutil.pid_exists(job.popen.pid):
             job.close_logs()
+            job.close_job_object()
             return True
     except:
         pass
@@ -322,46 +542,59 @@ def _kill_job(job: _Job, mode: str = "term") -> bool:
         return False
     
     job.close_logs()
+    job.close_job_object()
     return True
 
+# JOBS_LOCK is for mutations only: writers (start_job, the prune) hold it so their
+# check-then-set steps don't interleave. Readers skip it - a single dict.get or
+# list(dict.values()) runs in C under the GIL, so they always get a consistent view.
+# Per-job state is guarded by each job's own locks.
+def _list_jobs() -> List[_Job]:
+    return list(JOBS.values())
+
+def _stop_job_blocking(job_id: str, mode: str):
+    job = JOBS.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job_id not found")
+    _kill_job(job, mode=mode)
+
+def _stop_all_blocking(mode: str):
+    for job in _list_jobs():
+        _kill_job(job, mode=mode)
+
+# Kills block on psutil and process waits, so they run via asyncio.to_thread
 @app.post("/stop", dependencies=[Depends(require_auth)])
-def stop_job(req: StopRequest):
-    with JOBS_LOCK:
-        job = JOBS.get(req.job_id)
-        if not job:
-            raise HTTPException(status_code=404, detail="job_id not found")
-        _kill_job(job, mode=req.mode)
-        return {"status": "sent", "job_id": req.job_id, "mode": req.mode}
+async def stop_job(req: StopRequest):
+    await asyncio.to_thread(_stop_job_blocking, req.job_id, req.mode)
+    return {"status": "sent", "job_id": req.job_id, "mode": req.mode}
 
 @app.get("/status", response_model=List[ProcInfo], dependencies=[Depends(require_auth)])
-def status():
-    out: List[ProcInfo] = []
-    with JOBS_LOCK:
-        for job_id, job in JOBS.items():
-            out.append(job.snapshot())
-    return out
+async def status():
+    # Lock-free list copy and cached fields only, so this stays on the event loop
+    snapshots = [job.snapshot() for job in _list_jobs()]
+    # pydantic-core encodes straight to JSON bytes (no jsonable_encoder/json.dumps pass)
+    return Response(_PROC_INFO_LIST.dump_json(snapshots), media_type="application/json")
 
 @app.post("/stop_all", dependencies=[Depends(require_auth)])
-def stop_all(mode: str = "tree_kill"):
-    with JOBS_LOCK:
-        for job in list(JOBS.values()):
-            _kill_job(job, mode=mode)
+async def stop_all(mode: str = "tree_kill"):
+    await asyncio.to_thread(_stop_all_blocking, mode)
     return {"status": "sent", "mode": mode}
 
-# Optional background metrics thread (kept simple; snapshot() already updates on demand)
-def _metrics_loop():
+# Background metrics: samples CPU/memory for every job (snapshot() only reads the
+# cached values) and prunes long-exited jobs
+def _metrics_tick():
+    # The prune mutates JOBS and the heap; the copy after it is a lockless read
+    with JOBS_LOCK:
+        _prune_due(time.time())
+    for job in _list_jobs():
+        if job.popen.poll() is None:
+            job.sample()
+
+async def _metrics_loop():
+    # Started by lifespan; the tick may take JOBS_LOCK and makes psutil calls, so it
+    # runs on a worker thread instead of blocking the event loop
     while True:
-        time.sleep(METRICS_INTERVAL)
-        with JOBS_LOCK:
-            # prune exited to avoid leak
-            for jid, job in list(JOBS.items()):
-                if job.popen.poll() is not None:
-                    # keep it for a short while for inspection
-                    if (time.time() - job.start_ts) > 3600:
-                        job.close_logs()
-                        JOBS.pop(jid, None)
-
-t = threading.Thread(target=_metrics_loop, daemon=True)
-t.start()
+        await asyncio.sleep(METRICS_INTERVAL)
+        await asyncio.to_thread(_metrics_tick)
 
 # To run: uvicorn agent:app --host 0.0.0.0 --port 8081
@@ -4,13 +4,28 @@ import ntpath  # For parsing Windows paths on any platform
 import time
 import argparse
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 
-import requests
+import httpx
 import yaml
 
 DEFAULT_TIMEOUT = 5.0
 
+# Requests to all clients go out concurrently from one event loop over one
+# keep-alive AsyncClient, so repeated calls to an agent reuse their connection
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=64)
+
+def _client():
+    return httpx.AsyncClient(limits=HTTP_LIMITS, timeout=DEFAULT_TIMEOUT)
+
+def _pool_limiter():
+    """Semaphore that holds requests back once the connection pool is full.
+
+    Waiting here rather than in the pool means a queued request still gets its own
+    full timeout, instead of hitting PoolTimeout behind slow agents.
+    """
+    return asyncio.Semaphore(HTTP_LIMITS.max_connections)
+
 def load_inv(inv_path):
     with open(inv_path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
@@ -28,38 +43,50 @@ def filter_clients(inv, client_filter):
         print(f"[WARN] No clients matched filter: {client_filter}")
     return {**inv, "clients": filtered}
 
-def start_all(inv, payload):
+def _agent_url(c, path):
+    return f'http://{c["host"]}:{c.get("port", 8081)}{path}'
+
+async def _request(client, method, url, token, name, payload=None):
+    try:
+        resp = await client.request(method, url, json=payload, headers=auth_header(token))
+        if resp.is_success:
+            return name, True, resp.json()
+        return name, False, f"{resp.status_code} {resp.text}"
+    except Exception as e:
+        return name, False, str(e)
+
+def _broadcast(client, clients, method, path, token, payload=None):
+    """Send one request to every client at once. Yields awaitables for the
+    (name, ok, data) results in the order the replies arrive.
+    """
+    sem = _pool_limiter()
+
+    async def send(c):
+        async with sem:
+            return await _request(client, method, _agent_url(c, path), token, c["name"], payload)
+
+    return asyncio.as_completed([send(c) for c in clients])
+
+async def start_all(inv, payload):
     token = inv.get("token", "change-me")
-    futures = []
-    with ThreadPoolExecutor(max_workers=min(32, len(inv["clients"]))) as ex:
-        for c in inv["clients"]:
-            url = f'http://{c["host"]}:{c.get("port", 8081)}/start'
-            futures.append(ex.submit(_post_json, url, payload, token, c["name"]))
-        for fut in as_completed(futures):
-            name, ok, data = fut.result()
+    async with _client() as client:
+        for fut in _broadcast(client, inv["clients"], "POST", "/start", token, payload):
+            name, ok, data = await fut
             print(f"[{name}] start -> {ok} {data}")
 
-def stop_all(inv, mode="tree_kill"):
+async def stop_all(inv, mode="tree_kill"):
     token = inv.get("token", "change-me")
-    futures = []
-    with ThreadPoolExecutor(max_workers=min(32, len(inv["clients"]))) as ex:
-        for c in inv["clients"]:
-            url = f'http://{c["host"]}:{c.get("port", 8081)}/stop_all?mode={mode}'
-            futures.append(ex.submit(_post_empty, url, token, c["name"]))
-        for fut in as_completed(futures):
-            name, ok, data = fut.result()
+    async with _client() as client:
+        for fut in _broadcast(client, inv["clients"], "POST", f"/stop_all?mode={mode}", token):
+            name, ok, data = await fut
             print(f"[{name}] stop_all -> {ok} {data}")
 
-def status(inv):
+async def status(inv):
     token = inv.get("token", "change-me")
-    futures = []
-    with ThreadPoolExecutor(max_workers=min(32, len(inv["clients"]))) as ex:
-        for c in inv["clients"]:
-            url = f'http://{c["host"]}:{c.get("port", 8081)}/status'
-            futures.append(ex.submit(_get, url, token, c["name"]))
-        rows = []
-        for fut in as_completed(futures):
-            name, ok, data = fut.result()
+    rows = []
+    async with _client() as client:
+        for fut in _broadcast(client, inv["clients"], "GET", "/status", token):
+            name, ok, data = await fut
             if ok and isinstance(data, list):
                 if len(data) == 0:
                     # Agent is up but has no jobs
@@ -69,13 +96,13 @@ def status(inv):
                         rows.append((name, proc["job_id"], proc["pid"], proc["status"], round(proc["cpu_percent"], 1), round(proc["mem_mb"], 1), proc["is_hung"]))
             else:
                 rows.append((name, "-", "-", "unreachable", "-", "-", "-"))
-        rows.sort()
-        print("\nNAME | JOB_ID | PID | STATUS | CPU% | MEM(MB) | HUNG")
-        print("-"*72)
-        for r in rows:
-            print(f"{r[0]:<12} {r[1]:<36} {str(r[2]):<6} {r[3]:<10} {str(r[4]):<6} {str(r[5]):<8} {str(r[6])}")
+    rows.sort()
+    print("\nNAME | JOB_ID | PID | STATUS | CPU% | MEM(MB) | HUNG")
+    print("-"*72)
+    for r in rows:
+        print(f"{r[0]:<12} {r[1]:<36} {str(r[2]):<6} {r[3]:<10} {str(r[4]):<6} {str(r[5]):<8} {str(r[6])}")
 
-def exec_and_wait(inv, payload, poll_interval=1.0, timeout=300.0):
+async def exec_and_wait(inv, payload, poll_interval=1.0, timeout=300.0):
     """Execute a command and wait for it to complete. Returns dict of {client_name: returncode}."""
     import uuid
     token = inv.get("token", "change-me")
@@ -83,15 +110,11 @@ def exec_and_wait(inv, payload, poll_interval=1.0, timeout=300.0):
     # Start jobs on all clients
     job_id = payload.get("job_id") or str(uuid.uuid4())
     payload["job_id"] = job_id
-    futures = []
-    with ThreadPoolExecutor(max_workers=min(32, len(inv["clients"]))) as ex:
-        for c in inv["clients"]:
-            url = f'http://{c["host"]}:{c.get("port", 8081)}/start'
-            futures.append(ex.submit(_post_json, url, payload, token, c["name"]))
-
+    # One client for the start requests and every poll after them
+    async with _client() as client:
         started = {}
-        for fut in as_completed(futures):
-            name, ok, data = fut.result()
+        for fut in _broadcast(client, inv["clients"], "POST", "/start", token, payload):
+            name, ok, data = await fut
             if ok:
                 print(f"[{name}] started job {job_id}, pid {data.get('pid')}")
                 started[name] = True
@@ -99,54 +122,16 @@ def exec_and_wait(inv, payload, poll_interval=1.0, timeout=300.0):
                 print(f"[{name}] failed to start: {data}")
                 started[name] = False
 
-    # Poll for completion
-    print(f"\nWaiting for jobs to complete (timeout: {timeout}s)...")
-    start_time = time.time()
-    results = {}
-
-    while time.time() - start_time < timeout:
-        all_done = True
-        for c in inv["clients"]:
-            name = c["name"]
-            if name in results:
-                continue
-            if not started.get(name):
-                continue
-
-            # Check status
-            url = f'http://{c["host"]}:{c.get("port", 8081)}/status'
-            try:
-                resp = requests.get(url, headers=auth_header(token), timeout=DEFAULT_TIMEOUT)
-                if resp.ok:
-                    jobs = resp.json()
-                    found = False
-                    for job in jobs:
-                        if job["job_id"] == job_id:
-                            found = True
-                            if job["status"] in ("exited", "unknown"):
-                                # Process has ended (either cleanly or disappeared from process table)
-                                results[name] = job.get("returncode", 0)
-                                print(f"[{name}] completed with returncode {results[name]} (status: {job['status']})")
-                            else:
-                                print(f"[{name}] still running (status: {job['status']})")
-                                all_done = False
-                            break
-
-                    if not found:
-                        # Job not found in status list - may have exited very quickly
-                        # Mark as complete with unknown returncode
-                        results[name] = 0  # Assume success for fast-exit commands
-                        print(f"[{name}] job not found in status (likely exited quickly) - assuming success")
-                else:
-                    print(f"[{name}] HTTP error: {resp.status_code}")
-                    all_done = False
-            except Exception as e:
-                print(f"[{name}] error checking status: {e}")
-                all_done = False
-
-        if all_done:
-            break
-        time.sleep(poll_interval)
+        # Poll for completion; each started client gets its own task, so one that
+        # finishes early stops being polled and a slow one holds up nobody else
+        print(f"\nWaiting for jobs to complete (timeout: {timeout}s)...")
+        deadline = time.time() + timeout
+        sem = _pool_limiter()
+        pending = [c for c in inv["clients"] if started.get(c["name"])]
+        returncodes = await asyncio.gather(*(
+            _poll_until_done(client, sem, c, job_id, token, poll_interval, deadline) for c in pending
+        ))
+        results = {c["name"]: rc for c, rc in zip(pending, returncodes) if rc is not _TIMED_OUT}
 
     # Check for timeouts
     for c in inv["clients"]:
@@ -157,32 +142,40 @@ def exec_and_wait(inv, payload, poll_interval=1.0, timeout=300.0):
 
     return results
 
-def _post_json(url, payload, token, name):
-    try:
-        resp = requests.post(url, json=payload, headers=auth_header(token), timeout=DEFAULT_TIMEOUT)
-        if resp.ok:
-            return name, True, resp.json()
-        return name, False, f"{resp.status_code} {resp.text}"
-    except Exception as e:
-        return name, False, str(e)
-
-def _post_empty(url, token, name):
-    try:
-        resp = requests.post(url, headers=auth_header(token), timeout=DEFAULT_TIMEOUT)
-        if resp.ok:
-            return name, True, resp.json()
-        return name, False, f"{resp.status_code} {resp.text}"
-    except Exception as e:
-        return name, False, str(e)
+_TIMED_OUT = object()
+
+async def _poll_until_done(client, sem, c, job_id, token, poll_interval, deadline):
+    """Poll one agent's /status until job_id has ended. Returns its returncode, or _TIMED_OUT."""
+    name = c["name"]
+    url = _agent_url(c, "/status")
+    while time.time() < deadline:
+        try:
+            async with sem:
+                resp = await client.get(url, headers=auth_header(token))
+            if resp.is_success:
+                for job in resp.json():
+                    if job["job_id"] == job_id:
+                        if job["status"] in ("exited", "unknown"):
+                            # Process has ended (either cleanly or disappeared from process table)
+                            returncode = job.get("returncode", 0)
+                            print(f"[{name}] completed with returncode {returncode} (status: {job['status']})")
+                            return returncode
+                        print(f"[{name}] still running (status: {job['status']})")
+                        break
+                else:
+                    # Job not found in status list - may have exited very quickly
+                    # Mark as complete with unknown returncode
+                    print(f"[{name}] job not found in status (likely exited quickly) - assuming success")
+                    return 0  # Assume success for fast-exit commands
+            else:
+                print(f"[{name}] HTTP error: {resp.status_code}")
+        except Exception as e:
+            print(f"[{name}] error checking status: {e}")
+        await asyncio.sleep(poll_interval)
+    return _TIMED_OUT
 
-def _get(url, token, name):
-    try:
-        resp = requests.get(url, headers=auth_header(token), timeout=DEFAULT_TIMEOUT)
-        if resp.ok:
-            return name, True, resp.json()
-        return name, False, f"{resp.status_code} {resp.text}"
-    except Exception as e:
-        return name, False, str(e)
+# Script extensions generate_job_id looks for in args
+SCRIPT_EXTS = frozenset(('.py', '.ps1', '.bat', '.sh', '.js', '.rb', '.pl', '.r', '.m'))
 
 def generate_job_id(exe, args):
     """Generate a meaningful job_id from the command.
@@ -191,21 +184,16 @@ def generate_job_id(exe, args):
     Falls back to exe basename if no script found.
     Uses ntpath to correctly parse Windows paths even when running on Mac/Linux.
     """
-    # Common script extensions to look for
-    script_extensions = ('.py', '.ps1', '.bat', '.sh', '.js', '.rb', '.pl', '.r', '.m')
-
     # Search through args for any script files
     for arg in args:
         if not arg:
             continue
-        arg_lower = arg.lower()
-        for ext in script_extensions:
-            if arg_lower.endswith(ext):
-                # Found a script file, extract just the filename using ntpath (for Windows paths)
-                basename = ntpath.basename(arg)
-                # Remove the extension to keep it cleaner
-                name_without_ext = ntpath.splitext(basename)[0]
-                return name_without_ext
+        # One lowercase of the suffix and one set lookup per arg
+        dot = arg.rfind('.')
+        if dot >= 0 and arg[dot:].lower() in SCRIPT_EXTS:
+            # Found a script file, extract just the filename using ntpath (for Windows paths)
+            # and remove the extension to keep it cleaner
+            return ntpath.splitext(ntpath.basename(arg))[0]
 
     # No script found, use exe basename without extension
     basename = ntpath.basename(exe)
@@ -286,7 +274,7 @@ def main():
             "kill_existing": True
         }
         if args.wait:
-            results = exec_and_wait(inv, payload, timeout=args.timeout)
+            results = asyncio.run(exec_and_wait(inv, payload, timeout=args.timeout))
             print("\n=== RESULTS ===")
             all_success = True
             for name, returncode in sorted(results.items()):
@@ -301,11 +289,11 @@ def main():
             import sys
             sys.exit(0 if all_success else 1)
         else:
-            start_all(inv, payload)
+            asyncio.run(start_all(inv, payload))
     elif args.cmd == "stop":
-        stop_all(inv, mode=args.mode)
+        asyncio.run(stop_all(inv, mode=args.mode))
     elif args.cmd == "status":
-        status(inv)
+        asyncio.run(status(inv))
     elif args.cmd == "exec":
         payload = {
             "job_id": args.job_id,
@@ -315,7 +303,7 @@ def main():
             "log_dir": args.log_dir,
             "kill_existing": True  # Allow re-running same exec task (replaces previous)
         }
-        results = exec_and_wait(inv, payload, timeout=args.timeout)
+        results = asyncio.run(exec_and_wait(inv, payload, timeout=args.timeout))
         print("\n=== RESULTS ===")
         all_success = True
         for name, returncode in sorted(results.items()):